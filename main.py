@@ -1,4 +1,5 @@
 # -*- coding: utf8 -*-
+import copy
 import math
 import traceback
 from datetime import datetime
@@ -7,15 +8,72 @@ import uuid
 import argparse
 import getpass
 
+import hashlib
 import json
 import random
 import re
+import signal
 import time
 import os
 
 import requests
 from util.aes_help import  encrypt_data, decrypt_data
+from util.deadline import RunDeadline, DeadlineExceeded
 import util.zepp_helper as zeppHelper
+import util.endpoints as endpoints
+from util.simulator import EndpointModel, Simulation, format_report
+from util.checkpoint import RunCheckpoint
+from util.history import RunHistory, format_history_report, STATUS_SUCCESS, STATUS_FAILED, STATUS_SKIPPED, STATUS_BACKOFF, STATUS_RESUMED
+
+# 单个账号完成登录和提交步数预计需要的最少秒数，剩余预算不足时不再开始新的账号
+ACCOUNT_MIN_SECONDS = 30
+# 提交步数预计需要的最少秒数，登录后剩余预算不足时不再提交
+POST_MIN_SECONDS = 15
+# 被中断后等待执行中的账号结束的最长秒数，超时后不再等待直接进入收尾阶段
+INTERRUPT_JOIN_SECONDS = 5
+# 账号密码被服务端拒绝后的退避时间，每连续失败一次翻倍，直到上限；账号密码变更后立即重试
+LOGIN_BACKOFF_BASE_HOURS = 6
+LOGIN_BACKOFF_MAX_HOURS = 7 * 24
+# 登录失败类型：账号密码登录被拒绝、客户端登录被拒绝
+LOGIN_FAILURE_CREDENTIAL = "credential"
+LOGIN_FAILURE_GRANT = "grant"
+# 根据token状态预估的登录开销，数值越小越先执行：
+# 跳过（配置有误或退避中，不登录也不提交）、无需请求（缓存有效）、验证app_token、login_token刷新app_token、access_token重新获取、账号密码完整登录
+AUTH_COST_SKIP = -1
+AUTH_COST_NONE = 0
+AUTH_COST_CHECK = 1
+AUTH_COST_APP_TOKEN = 2
+AUTH_COST_LOGIN_TOKEN = 3
+AUTH_COST_FULL_LOGIN = 4
+# 各登录开销对应依次尝试的请求链，用于模拟：整组请求成功即登录成功，失败则退到下一组；None表示跳过该账号
+FULL_LOGIN_ATTEMPT = ["login_access_token", "grant_login_tokens"]
+AUTH_COST_ATTEMPTS = {
+    AUTH_COST_SKIP: None,
+    AUTH_COST_NONE: [],
+    AUTH_COST_CHECK: [["check_app_token"], ["grant_app_token"], ["grant_login_tokens"], FULL_LOGIN_ATTEMPT],
+    AUTH_COST_APP_TOKEN: [["grant_app_token"], ["grant_login_tokens"], FULL_LOGIN_ATTEMPT],
+    AUTH_COST_LOGIN_TOKEN: [["grant_login_tokens"], FULL_LOGIN_ATTEMPT],
+    AUTH_COST_FULL_LOGIN: [FULL_LOGIN_ATTEMPT],
+}
+# 各登录开销的名称，用于模拟输出
+AUTH_COST_NAMES = {
+    AUTH_COST_SKIP: "跳过",
+    AUTH_COST_NONE: "缓存有效",
+    AUTH_COST_CHECK: "验证app_token",
+    AUTH_COST_APP_TOKEN: "login_token刷新",
+    AUTH_COST_LOGIN_TOKEN: "access_token重新获取",
+    AUTH_COST_FULL_LOGIN: "账号密码登录",
+}
+# 实际采用的登录方式，写入执行历史：使用缓存、验证app_token、login_token刷新、access_token重新获取、账号密码登录、退避跳过、配置有误
+AUTH_PHASE_CACHED = "cached"
+AUTH_PHASE_CHECK = "check"
+AUTH_PHASE_APP_TOKEN = "app_token"
+AUTH_PHASE_LOGIN_TOKEN = "login_token"
+AUTH_PHASE_FULL_LOGIN = "full_login"
+AUTH_PHASE_BACKOFF = "backoff"
+AUTH_PHASE_INVALID = "invalid"
+# token加密存储文件
+TOKENS_PATH = "encrypted_tokens.data"
 
 # 获取默认值转int
 def get_int_value_default(_config: dict, _key, default):
@@ -24,14 +82,12 @@ def get_int_value_default(_config: dict, _key, default):
 
 
 # 获取当前时间对应的最大和最小步数
-def get_min_max_by_time(hour=None, minute=None):
-    if hour is None:
-        hour = time_bj.hour
-    if minute is None:
-        minute = time_bj.minute
-    time_rate = min((hour * 60 + minute) / (22 * 60), 1)
-    min_step = get_int_value_default(config, 'MIN_STEP', 18000)
-    max_step = get_int_value_default(config, 'MAX_STEP', 25000)
+def get_min_max_by_time(_config: dict, now=None):
+    if now is None:
+        now = get_beijing_time()
+    time_rate = min((now.hour * 60 + now.minute) / (22 * 60), 1)
+    min_step = get_int_value_default(_config, 'MIN_STEP', 18000)
+    max_step = get_int_value_default(_config, 'MAX_STEP', 25000)
     return int(time_rate * min_step), int(time_rate * max_step)
 
 
@@ -85,17 +141,17 @@ def get_error_code(location):
 
 
 # pushplus消息推送
-def push_plus(title, content):
+def push_plus(token, title, content):
     requestUrl = f"http://www.pushplus.plus/send"
     data = {
-        "token": PUSH_PLUS_TOKEN,
+        "token": token,
         "title": title,
         "content": content,
         "template": "html",
         "channel": "wechat"
     }
     try:
-        response = requests.post(requestUrl, data=data)
+        response = requests.post(requestUrl, data=data, timeout=(5, 10))
         if response.status_code == 200:
             json_res = response.json()
             print(f"pushplus推送完毕：{json_res['code']}-{json_res['msg']}")
@@ -106,8 +162,9 @@ def push_plus(title, content):
 
 
 class MiMotionRunner:
-    def __init__(self, _user, _passwd, _user_tokens=None):
+    def __init__(self, _user, _passwd, _user_tokens=None, deadline=None):
         self.user_id = None
+        self.deadline = deadline
         self.device_id = str(uuid.uuid4())
         user = str(_user)
         password = str(_passwd)
@@ -128,6 +185,12 @@ class MiMotionRunner:
         else:
             self.is_phone = False
         self.user = user
+        # 账号密码摘要，用于判断登录失败记录是否对应当前配置
+        self.credential_hash = hashlib.sha256(f"{user}:{password}".encode("utf-8")).hexdigest()
+        self.backoff_skipped = False
+        # 实际采用的登录方式，以及本账号发出的全部请求记录，用于写入执行历史
+        self.auth_phase = None
+        self.trace = []
         # self.fake_ip_addr = fake_ip()
         # self.log_str += f"创建虚拟ip地址：{self.fake_ip_addr}\n"
 
@@ -147,13 +210,87 @@ class MiMotionRunner:
         except:
             return True
 
+    # 处于登录失败退避期内时返回退避小时数，否则返回None
+    # check_credentials为False时不比较账号密码，视为未变更（模拟时只有token存储中的账号，没有密码）
+    def _login_backoff_hours(self, check_credentials=True):
+        user_token_info = self.user_tokens.get(self.user)
+        if user_token_info is None or user_token_info.get("login_failure") is None:
+            return None
+        failure = user_token_info["login_failure"]
+        if check_credentials and failure.get("credential_hash") != self.credential_hash:
+            return None
+        backoff_hours = min(LOGIN_BACKOFF_BASE_HOURS * 2 ** (failure["count"] - 1), LOGIN_BACKOFF_MAX_HOURS)
+        if self._is_token_expired(failure.get("time"), expire_hours=backoff_hours):
+            return None
+        return backoff_hours
+
+    # 检查是否处于登录失败退避期内
+    def _in_login_backoff(self):
+        user_token_info = self.user_tokens.get(self.user)
+        if user_token_info is None or user_token_info.get("login_failure") is None:
+            return False
+        failure = user_token_info["login_failure"]
+        if failure.get("credential_hash") != self.credential_hash:
+            # 账号密码已变更，清除失败记录重新尝试
+            self.log_str += "账号密码已变更，清除登录失败记录\n"
+            del user_token_info["login_failure"]
+            return False
+        backoff_hours = self._login_backoff_hours()
+        if backoff_hours is None:
+            return False
+        self.log_str += f"账号密码此前被拒绝（{failure['class']}，连续{failure['count']}次），{backoff_hours}小时内不再尝试登录，修改账号密码后将立即重试\n"
+        return True
+
+    # 记录登录失败，连续失败次数在账号密码不变时累加
+    def _record_login_failure(self, failure_class):
+        user_token_info = self.user_tokens.setdefault(self.user, dict())
+        failure = user_token_info.get("login_failure")
+        count = 0
+        if failure is not None and failure.get("credential_hash") == self.credential_hash:
+            count = failure.get("count", 0)
+        user_token_info["login_failure"] = {
+            "class": failure_class,
+            "count": count + 1,
+            "time": get_time(),
+            "credential_hash": self.credential_hash,
+        }
+
+    # 预估登录开销，与login中的判断顺序一致，不发起请求
+    # check_credentials为False时不检查账号密码是否有效，仅根据token存储判断
+    def predict_auth_cost(self, skip_token_check=False, check_credentials=True):
+        if check_credentials and self.invalid:
+            return AUTH_COST_SKIP
+        if self._login_backoff_hours(check_credentials) is not None:
+            return AUTH_COST_SKIP
+        return self._predict_token_cost(skip_token_check)
+
+    # 根据token的获取时间预估登录开销
+    def _predict_token_cost(self, skip_token_check=False):
+        user_token_info = self.user_tokens.get(self.user)
+        if user_token_info is None or user_token_info.get("access_token") is None:
+            return AUTH_COST_FULL_LOGIN
+        if not self._is_token_expired(user_token_info.get("app_token_time"), expire_hours=24):
+            return AUTH_COST_NONE
+        if not skip_token_check:
+            return AUTH_COST_CHECK
+        if not self._is_token_expired(user_token_info.get("login_token_time"), expire_hours=7*24):
+            return AUTH_COST_APP_TOKEN
+        if not self._is_token_expired(user_token_info.get("access_token_time"), expire_hours=30*24):
+            return AUTH_COST_LOGIN_TOKEN
+        return AUTH_COST_FULL_LOGIN
+
     # 登录
     def login(self, skip_token_check=False):
         """
         skip_token_check: 如果为True，跳过API验证，仅基于时间判断token是否过期
         """
+        if self._in_login_backoff():
+            self.backoff_skipped = True
+            self.auth_phase = AUTH_PHASE_BACKOFF
+            return None
         user_token_info = self.user_tokens.get(self.user)
-        if user_token_info is not None:
+        # 仅有登录失败记录而没有token时按首次登录处理
+        if user_token_info is not None and user_token_info.get("access_token") is not None:
             access_token = user_token_info.get("access_token")
             login_token = user_token_info.get("login_token")
             app_token = user_token_info.get("app_token")
@@ -168,6 +305,7 @@ class MiMotionRunner:
             if not self._is_token_expired(app_token_time, expire_hours=24):
                 # app_token在24小时内，认为有效，直接使用
                 self.log_str += f"使用缓存的app_token（距获取时间：{int((int(get_time()) - int(app_token_time)) / (1000 * 60 * 60))}小时）\n"
+                self.auth_phase = AUTH_PHASE_CACHED
                 return app_token
             
             # app_token可能过期，需要验证或刷新
@@ -176,7 +314,8 @@ class MiMotionRunner:
                 self.log_str += "app_token可能已过期，尝试刷新\n"
             else:
                 # 调用API验证token是否真的有效
-                ok, msg = zeppHelper.check_app_token(app_token)
+                self.auth_phase = AUTH_PHASE_CHECK
+                ok, msg = zeppHelper.check_app_token(app_token, self.deadline, self.trace)
                 if ok:
                     # token仍然有效，更新时间戳
                     user_token_info["app_token_time"] = get_time()
@@ -189,7 +328,8 @@ class MiMotionRunner:
             login_token_time = user_token_info.get("login_token_time")
             if not self._is_token_expired(login_token_time, expire_hours=7*24):
                 # login_token在7天内，尝试刷新app_token
-                app_token, msg = zeppHelper.grant_app_token(login_token)
+                self.auth_phase = AUTH_PHASE_APP_TOKEN
+                app_token, msg = zeppHelper.grant_app_token(login_token, self.deadline, self.trace)
                 if app_token is not None:
                     self.log_str += "使用login_token刷新app_token成功\n"
                     user_token_info["app_token"] = app_token
@@ -201,7 +341,8 @@ class MiMotionRunner:
             if not self._is_token_expired(access_token_time, expire_hours=30*24):
                 # access_token在30天内，尝试重新获取login_token和app_token
                 self.log_str += f"login_token失效或无法刷新，使用access_token重新获取 last grant time: {login_token_time}\n"
-                login_token, app_token, user_id, msg = zeppHelper.grant_login_tokens(access_token, self.device_id, self.is_phone)
+                self.auth_phase = AUTH_PHASE_LOGIN_TOKEN
+                login_token, app_token, user_id, msg = zeppHelper.grant_login_tokens(access_token, self.device_id, self.is_phone, self.deadline, self.trace)
                 if login_token is not None:
                     user_token_info["login_token"] = login_token
                     user_token_info["app_token"] = app_token
@@ -217,14 +358,21 @@ class MiMotionRunner:
                 self.log_str += f"access_token已过期（距获取时间：{int((int(get_time()) - int(access_token_time)) / (1000 * 60 * 60))}小时）\n"
 
         # access_token 失效 或者没有保存加密数据
-        access_token, msg = zeppHelper.login_access_token(self.user, self.password)
+        self.auth_phase = AUTH_PHASE_FULL_LOGIN
+        access_token, msg, error_code = zeppHelper.login_access_token(self.user, self.password, self.deadline, self.trace)
         if access_token is None:
             self.log_str += "登录获取accessToken失败：%s" % msg
+            if error_code is not None:
+                # 服务端明确拒绝，通常为账号密码错误，网络异常等不记录
+                self._record_login_failure(LOGIN_FAILURE_CREDENTIAL)
             return None
         # print(f"device_id:{self.device_id} isPhone: {self.is_phone}")
-        login_token, app_token, user_id, msg = zeppHelper.grant_login_tokens(access_token, self.device_id, self.is_phone)
+        login_token, app_token, user_id, msg = zeppHelper.grant_login_tokens(access_token, self.device_id, self.is_phone, self.deadline, self.trace)
         if login_token is None:
             self.log_str += f"登录提取的 access_token 无效：{msg}"
+            if msg is not None:
+                # 客户端登录返回非ok结果
+                self._record_login_failure(LOGIN_FAILURE_GRANT)
             return None
 
         user_token_info = dict()
@@ -240,17 +388,28 @@ class MiMotionRunner:
             self.device_id = uuid.uuid4()
         user_token_info["device_id"] = self.device_id
         self.user_tokens[self.user] = user_token_info
+        self.user_id = user_id
         return app_token
 
 
-    # 主函数
-    def login_and_post_step(self, step_value=None, min_step=None, max_step=None, skip_token_check=False):
+    # 登录阶段 返回：app_token, 失败信息
+    def authenticate(self, skip_token_check=False):
         if self.invalid:
-            return "账号或密码配置有误", False
+            self.auth_phase = AUTH_PHASE_INVALID
+            return None, "账号或密码配置有误"
         app_token = self.login(skip_token_check=skip_token_check)
+        if self.backoff_skipped:
+            return None, "账号密码此前登录失败，退避期内跳过"
         if app_token is None:
-            return "登陆失败！", False
+            return None, "登陆失败！"
+        # 登录成功后清除此前的失败记录
+        user_token_info = self.user_tokens.get(self.user)
+        if user_token_info is not None:
+            user_token_info.pop("login_failure", None)
+        return app_token, None
 
+    # 提交步数阶段
+    def post_step(self, app_token, step_value=None, min_step=None, max_step=None):
         if step_value is not None:
             # 使用指定的步数
             step = str(step_value)
@@ -259,119 +418,475 @@ class MiMotionRunner:
             # 使用随机步数
             step = str(random.randint(min_step, max_step))
             self.log_str += f"已设置为随机步数范围({min_step}~{max_step}) 随机值:{step}\n"
-        ok, msg = zeppHelper.post_fake_brand_data(step, app_token, self.user_id)
+        ok, msg = zeppHelper.post_fake_brand_data(step, app_token, self.user_id, self.deadline, self.trace)
         return f"修改步数（{step}）[" + msg + "]", ok
 
+    # 主函数
+    def login_and_post_step(self, step_value=None, min_step=None, max_step=None, skip_token_check=False):
+        app_token, msg = self.authenticate(skip_token_check)
+        if app_token is None:
+            return msg, False
+        return self.post_step(app_token, step_value, min_step, max_step)
+
 
 # 启动主函数
-def push_to_push_plus(exec_results, summary):
+def push_to_push_plus(ctx, exec_results, summary):
     # 判断是否需要pushplus推送
-    if PUSH_PLUS_TOKEN is not None and PUSH_PLUS_TOKEN != '' and PUSH_PLUS_TOKEN != 'NO':
-        if PUSH_PLUS_HOUR is not None and PUSH_PLUS_HOUR.isdigit():
-            if time_bj.hour != int(PUSH_PLUS_HOUR):
-                print(f"当前设置push_plus推送整点为：{PUSH_PLUS_HOUR}, 当前整点为：{time_bj.hour}，跳过推送")
+    if ctx.push_plus_token is not None and ctx.push_plus_token != '' and ctx.push_plus_token != 'NO':
+        if ctx.push_plus_hour is not None and ctx.push_plus_hour.isdigit():
+            if ctx.time_bj.hour != int(ctx.push_plus_hour):
+                print(f"当前设置push_plus推送整点为：{ctx.push_plus_hour}, 当前整点为：{ctx.time_bj.hour}，跳过推送")
                 return
         html = f'<div>{summary}</div>'
-        if len(exec_results) >= PUSH_PLUS_MAX:
+        if len(exec_results) >= ctx.push_plus_max:
             html += '<div>账号数量过多，详细情况请前往github actions中查看</div>'
         else:
             html += '<ul>'
             for exec_result in exec_results:
                 success = exec_result['success']
-                if success is not None and success is True:
+                if exec_result.get('skipped'):
+                    html += f'<li><span>账号：{exec_result["user"]}</span>未执行，原因：{exec_result["msg"]}</li>'
+                elif exec_result.get('backoff'):
+                    html += f'<li><span>账号：{exec_result["user"]}</span>已跳过，原因：{exec_result["msg"]}</li>'
+                elif success is not None and success is True:
                     html += f'<li><span>账号：{exec_result["user"]}</span>刷步数成功，接口返回：{exec_result["msg"]}</li>'
                 else:
                     html += f'<li><span>账号：{exec_result["user"]}</span>刷步数失败，失败原因：{exec_result["msg"]}</li>'
             html += '</ul>'
-        push_plus(f"{format_now()} 刷步数通知", html)
+        push_plus(ctx.push_plus_token, f"{format_now()} 刷步数通知", html)
+
+
+class AccountTask:
+    """流水线中的单个账号，记录执行日志和结果"""
 
+    def __init__(self, total, idx, user_mi, passwd_mi, user_tokens=None, deadline=None, checkpoint=None):
+        self.idx = idx
+        self.user_mi = user_mi
+        self.runner = MiMotionRunner(user_mi, passwd_mi, user_tokens, deadline)
+        self.log_str = f"[{idx + 1}/{total}]账号：{desensitize_user_name(user_mi)}\n"
+        self.result = None
+        self.checkpoint = checkpoint
+        # 登录和提交步数阶段各自的耗时（毫秒），未执行的阶段为None
+        self.auth_ms = None
+        self.post_ms = None
+        self.resumed = False
 
-def run_single_account(total, idx, user_mi, passwd_mi, user_tokens=None, step_value=None, min_step=None, max_step=None, skip_token_check=False):
-    idx_info = ""
-    if idx is not None:
-        idx_info = f"[{idx + 1}/{total}]"
-    log_str = f"[{format_now()}]\n{idx_info}账号：{desensitize_user_name(user_mi)}\n"
+    def finish(self, exec_msg, success):
+        self.log_str += self.runner.log_str
+        self.log_str += f'{exec_msg}\n'
+        self.result = {"user": self.user_mi, "success": success,
+                       "msg": exec_msg, "backoff": self.runner.backoff_skipped}
+        print(f"[{format_now()}]\n{self.log_str}")
+        if self.checkpoint is not None:
+            # 每完成一个账号立即写入断点，进程中断时只损失正在执行的账号
+            try:
+                self.checkpoint.record(self.user_mi, self.result, self.runner.user,
+                                       self.runner.user_tokens.get(self.runner.user))
+            except:
+                print(f"写入断点异常:{traceback.format_exc()}")
+
+    def fail(self, exec_msg):
+        self.finish(exec_msg, False)
+
+    def skip(self):
+        """剩余预算不足，尚未发出本阶段的请求即放弃，视为未执行；不写入断点，恢复执行时会重新执行"""
+        print(f"[{format_now()}]\n{self.log_str}{self.runner.log_str}执行时间预算不足，跳过\n")
+        self.result = not_attempted_result(self.user_mi)
+
+
+def run_auth_stage(task: AccountTask, skip_token_check=False, deadline=None):
+    """登录阶段，返回app_token；失败或跳过时直接记录结果并返回None"""
+    if deadline is not None and deadline.should_stop(ACCOUNT_MIN_SECONDS):
+        # 剩余预算不足，不再开始新的账号，留给收尾阶段保存token和推送
+        task.skip()
+        return None
+    start = time.monotonic()
+    sent = len(task.runner.trace)
     try:
-        runner = MiMotionRunner(user_mi, passwd_mi, user_tokens)
-        exec_msg, success = runner.login_and_post_step(step_value, min_step, max_step, skip_token_check)
-        log_str += runner.log_str
-        log_str += f'{exec_msg}\n'
-        exec_result = {"user": user_mi, "success": success,
-                       "msg": exec_msg}
+        app_token, msg = task.runner.authenticate(skip_token_check)
+        task.auth_ms = (time.monotonic() - start) * 1000
+        if app_token is None:
+            task.fail(msg)
+        return app_token
+    except DeadlineExceeded:
+        task.auth_ms = (time.monotonic() - start) * 1000
+        stop_by_deadline(task, sent)
     except:
-        log_str += f"执行异常:{traceback.format_exc()}\n"
-        log_str += traceback.format_exc()
-        exec_result = {"user": user_mi, "success": False,
-                       "msg": f"执行异常:{traceback.format_exc()}"}
-    print(log_str)
-    return exec_result
-
-
-def execute(encrypt_support=False, user_tokens_dict=None, aes_key=None, step_value=None, min_step=None, max_step=None, skip_token_check=False):
-    if user_tokens_dict is None:
-        user_tokens_dict = {}
-    user_list = users.split('#')
-    passwd_list = passwords.split('#')
+        task.auth_ms = (time.monotonic() - start) * 1000
+        task.fail(f"执行异常:{traceback.format_exc()}")
+    return None
+
+
+def run_post_stage(task: AccountTask, app_token, step_value=None, min_step=None, max_step=None):
+    """提交步数阶段"""
+    start = time.monotonic()
+    sent = len(task.runner.trace)
+    try:
+        exec_msg, success = task.runner.post_step(app_token, step_value, min_step, max_step)
+        task.post_ms = (time.monotonic() - start) * 1000
+        task.finish(exec_msg, success)
+    except DeadlineExceeded:
+        task.post_ms = (time.monotonic() - start) * 1000
+        stop_by_deadline(task, sent)
+    except:
+        task.post_ms = (time.monotonic() - start) * 1000
+        task.fail(f"执行异常:{traceback.format_exc()}")
+
+
+def stop_by_deadline(task: AccountTask, sent):
+    """预算耗尽时，本阶段尚未发出请求的账号视为未执行，已发出请求的视为失败"""
+    if len(task.runner.trace) == sent:
+        task.skip()
+    else:
+        task.fail("执行时间预算耗尽，中断执行")
+
+
+def not_attempted_result(user_mi):
+    return {"user": user_mi, "success": False, "skipped": True,
+            "msg": "执行时间预算不足，未执行"}
+
+
+class ExecutionContext:
+    """
+    一批账号的执行配置和执行状态，同一进程内的多个批次各自持有，互不影响
+    参数：
+      - users / passwords: 账号和密码，多账号用#分隔
+      - step_value: 指定步数，为None时在 min_step ~ max_step 之间随机
+      - push_plus_token / push_plus_hour / push_plus_max: pushplus推送配置，token为空时不推送
+      - sleep_seconds: 串行模式下同一阶段请求之间的间隔
+      - use_concurrent: 是否并发执行
+      - run_timeout: 整体执行时间预算秒数，为None时不限制，从 Runner.run 开始计时
+      - aes_key: 16字节AES密钥，为None时不保存token
+      - tokens_path / checkpoint_path: token存储和执行断点文件，并发执行的批次需使用不同的文件
+      - time_bj: 本批次的北京时间，用于推送整点判断和断点日期，默认为创建时的时间
+      - history: 执行历史 RunHistory，为None时不记录，多个批次可共用同一个
+    """
+
+    def __init__(self, users, passwords, step_value=None, min_step=None, max_step=None,
+                 push_plus_token=None, push_plus_hour=None, push_plus_max=30, sleep_seconds=5,
+                 use_concurrent=False, skip_token_check=False, run_timeout=None, aes_key=None,
+                 tokens_path=TOKENS_PATH, checkpoint_path=None, checkpoint_window_hours=2,
+                 resume=False, time_bj=None, history=None):
+        self.users = users
+        self.passwords = passwords
+        self.user_list = users.split('#') if users else []
+        self.passwd_list = passwords.split('#') if passwords else []
+        if users and passwords and len(self.user_list) != len(self.passwd_list):
+            raise ValueError(f"账号数长度[{len(self.user_list)}]和密码数长度[{len(self.passwd_list)}]不匹配，跳过执行")
+        self.step_value = step_value
+        self.min_step = min_step
+        self.max_step = max_step
+        self.push_plus_token = push_plus_token
+        self.push_plus_hour = push_plus_hour
+        self.push_plus_max = push_plus_max
+        self.sleep_seconds = float(sleep_seconds)
+        self.use_concurrent = use_concurrent
+        self.skip_token_check = skip_token_check
+        self.run_timeout = run_timeout
+        self.aes_key = aes_key
+        self.encrypt_support = aes_key is not None
+        self.tokens_path = tokens_path
+        self.resume = resume
+        self.time_bj = time_bj if time_bj is not None else get_beijing_time()
+        self.checkpoint = RunCheckpoint(checkpoint_path, aes_key, checkpoint_window_hours) if checkpoint_path else None
+        self.history = history
+        self.deadline = None
+        self.user_tokens = dict()
+        # 加载时的token明文摘要，用于判断本次执行后token是否有变化
+        self.loaded_tokens_digest = None
+        if self.encrypt_support:
+            self.user_tokens, self.loaded_tokens_digest = prepare_user_tokens(aes_key, tokens_path)
+
+
+def run_pipeline(ctx, tasks):
+    """
+    登录和提交步数分为两个阶段，各自使用独立的线程池和队列
+    账号按预估登录开销排序，缓存有效的账号先进入提交阶段，需要重新登录的账号在登录阶段并行处理
+    串行模式下每个阶段一个线程，同一阶段的请求之间间隔 ctx.sleep_seconds
+    """
+    import concurrent.futures
+    concurrent_workers = None if ctx.use_concurrent else 1
+    deadline = ctx.deadline
+    costs = {task.idx: task.runner.predict_auth_cost(ctx.skip_token_check) for task in tasks}
+    ordered = sorted(tasks, key=lambda task: costs[task.idx])
+    serial = concurrent_workers == 1
+
+    def wait_gap():
+        # 串行模式下同一阶段的请求之间间隔一定时间，避免接口请求过于频繁导致异常
+        gap = ctx.sleep_seconds
+        if deadline is not None:
+            gap = min(gap, max(deadline.work_remaining(), 0))
+        time.sleep(gap)
+
+    posted = []
+
+    def post(task, app_token):
+        if serial and len(posted) > 0:
+            wait_gap()
+        posted.append(task.idx)
+        if deadline is not None and deadline.should_stop(POST_MIN_SECONDS):
+            # 缓存有效的账号登录阶段立即通过，可能在提交队列中等到预算不足
+            task.skip()
+            return
+        run_post_stage(task, app_token, ctx.step_value, ctx.min_step, ctx.max_step)
+
+    auth_pool = concurrent.futures.ThreadPoolExecutor(max_workers=concurrent_workers, thread_name_prefix="auth")
+    post_pool = concurrent.futures.ThreadPoolExecutor(max_workers=concurrent_workers, thread_name_prefix="post")
+
+    futures = []
+
+    def auth(task):
+        app_token = run_auth_stage(task, ctx.skip_token_check, deadline)
+        if app_token is not None:
+            futures.append(post_pool.submit(post, task, app_token))
+        # 因预算不足跳过的账号没有发起请求，无需间隔
+        skipped = task.result is not None and task.result.get('skipped')
+        if serial and costs[task.idx] > AUTH_COST_NONE and not skipped and task is not ordered[-1]:
+            wait_gap()
+
+    try:
+        for task in ordered:
+            futures.append(auth_pool.submit(auth, task))
+        # 登录阶段全部完成后提交阶段不会再有新任务
+        auth_pool.shutdown(wait=True)
+        post_pool.shutdown(wait=True)
+    except BaseException:
+        # 被中断时取消尚未开始的任务，执行中的账号在发起下一个请求前停止
+        if deadline is not None:
+            deadline.expire()
+        auth_pool.shutdown(wait=False, cancel_futures=True)
+        post_pool.shutdown(wait=False, cancel_futures=True)
+        # 等待执行中的账号结束（请求受超时限制），避免收尾阶段保存token和汇总结果时仍有线程在修改
+        # 被取消的任务不会再执行，且不会被wait视为完成，需排除
+        running = [future for future in list(futures) if not future.cancelled()]
+        concurrent.futures.wait(running, timeout=INTERRUPT_JOIN_SECONDS)
+        raise
+
+
+def restore_checkpoint(ctx):
+    """开始断点记录；resume时恢复断点中的token，返回可恢复的记录"""
+    checkpoint = ctx.checkpoint
+    entries = checkpoint.start(ctx.time_bj.strftime("%F"), ctx.resume)
+    if ctx.resume:
+        print(f"从断点恢复：已记录{len(entries)}个账号" if len(entries) > 0 else "没有可恢复的断点，重新执行全部账号")
+    for entry in entries.values():
+        restored = checkpoint.restore_tokens(entry)
+        if restored is not None:
+            ctx.user_tokens[restored[0]] = restored[1]
+    return entries
+
+
+def execute(ctx) -> list:
+    """执行一批账号，返回每个账号的执行结果"""
+    # 未设置执行预算时不限制时间，但仍需要deadline在被中断时停止执行中的账号
+    ctx.deadline = RunDeadline(float(ctx.run_timeout) if ctx.run_timeout is not None else math.inf)
+    checkpoint = ctx.checkpoint
+    total = len(ctx.user_list)
+    entries = restore_checkpoint(ctx) if checkpoint is not None else dict()
+    tasks = [AccountTask(total, idx, user_mi, passwd_mi, ctx.user_tokens, ctx.deadline, checkpoint)
+             for idx, (user_mi, passwd_mi) in enumerate(zip(ctx.user_list, ctx.passwd_list))]
+    pending = []
+    for task in tasks:
+        entry = checkpoint.lookup(entries, task.user_mi) if checkpoint is not None else None
+        if entry is not None and entry["result"].get("success") is True:
+            # 断点中已成功的账号不再执行，失败的账号重新执行
+            task.result = dict(entry["result"], user=task.user_mi, msg=f"断点恢复：{entry['result']['msg']}")
+            task.resumed = True
+        else:
+            pending.append(task)
     exec_results = []
-    if len(user_list) == len(passwd_list):
-        idx, total = 0, len(user_list)
-        if use_concurrent:
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                exec_results = executor.map(lambda x: run_single_account(total, x[0], *x[1], user_tokens_dict, step_value, min_step, max_step, skip_token_check),
-                                            enumerate(zip(user_list, passwd_list)))
+    start = time.monotonic()
+    try:
+        run_pipeline(ctx, pending)
+    finally:
+        # 收尾阶段：无论是否中断都保存token并输出汇总
+        # 被中断时尚未得到结果的账号视为未执行
+        exec_results = [task.result if task.result is not None else not_attempted_result(task.user_mi) for task in tasks]
+        if ctx.history is not None:
+            try:
+                record_history(ctx, tasks, exec_results, (time.monotonic() - start) * 1000)
+            except:
+                print(f"写入执行历史异常:{traceback.format_exc()}")
+        finish_execution(ctx, exec_results)
+    return exec_results
+
+
+def record_history(ctx, tasks, exec_results, wall_ms):
+    """将本次执行的账号结果和接口请求追加到执行历史"""
+    history = ctx.history
+    run_id = history.start_run(ctx.time_bj.strftime("%F"))
+    success, failed = 0, 0
+    for task, result in zip(tasks, exec_results):
+        if task.resumed:
+            status = STATUS_RESUMED
+        elif result.get('skipped'):
+            status = STATUS_SKIPPED
+        elif result.get('backoff'):
+            status = STATUS_BACKOFF
+        elif result['success'] is True:
+            status = STATUS_SUCCESS
         else:
-            for user_mi, passwd_mi in zip(user_list, passwd_list):
-                exec_results.append(run_single_account(total, idx, user_mi, passwd_mi, user_tokens_dict, step_value, min_step, max_step, skip_token_check))
-                idx += 1
-                if idx < total:
-                    # 每个账号之间间隔一定时间请求一次，避免接口请求过于频繁导致异常
-                    time.sleep(sleep_seconds)
-        if encrypt_support and user_tokens_dict is not None and aes_key is not None:
-            persist_user_tokens(user_tokens_dict, aes_key)
-        success_count = 0
-        push_results = []
-        for result in exec_results:
-            push_results.append(result)
-            if result['success'] is True:
-                success_count += 1
-        summary = f"\n执行账号总数{total}，成功：{success_count}，失败：{total - success_count}"
-        print(summary)
-        push_to_push_plus(push_results, summary)
+            status = STATUS_FAILED
+        success += status == STATUS_SUCCESS
+        failed += status == STATUS_FAILED
+        history.record_account(run_id, task.runner.user, task.runner.auth_phase,
+                               status, task.auth_ms, task.post_ms, list(task.runner.trace))
+    history.finish_run(run_id, len(tasks), success, failed, wall_ms)
+
+
+def simulate(ctx, accounts=None, endpoint_models=None, seed=0):
+    """
+    模拟执行，不发起网络请求，预估总耗时、最大并发连接数和各接口请求速率
+    账号的token状态取自已配置的账号；未配置账号时取token存储中的全部账号
+    accounts: 模拟的账号数，与实际账号数不同时按实际的token状态分布循环扩展
+    """
+    if len(ctx.user_list) > 0 and len(ctx.passwd_list) > 0:
+        costs = [MiMotionRunner(user_mi, passwd_mi, ctx.user_tokens).predict_auth_cost(ctx.skip_token_check)
+                 for user_mi, passwd_mi in zip(ctx.user_list, ctx.passwd_list)]
     else:
-        print(f"账号数长度[{len(user_list)}]和密码数长度[{len(passwd_list)}]不匹配，跳过执行")
-        exit(1)
+        # token存储中没有密码，假定账号密码有效且未变更
+        costs = [MiMotionRunner(user_mi, '', ctx.user_tokens).predict_auth_cost(ctx.skip_token_check, check_credentials=False)
+                 for user_mi in ctx.user_tokens.keys()]
+    if accounts is not None:
+        if len(costs) == 0:
+            costs = [AUTH_COST_FULL_LOGIN]
+        costs = [costs[i % len(costs)] for i in range(accounts)]
+    mix = {cost: costs.count(cost) for cost in sorted(set(costs))}
+    print(f"模拟账号登录开销分布（{'、'.join(f'{AUTH_COST_NAMES[cost]}:{count}' for cost, count in mix.items())}），线程数：{'默认' if ctx.use_concurrent else 1}，间隔：{ctx.sleep_seconds}秒")
+    workers = min(32, (os.cpu_count() or 1) + 4) if ctx.use_concurrent else 1
+    report = Simulation(costs, AUTH_COST_ATTEMPTS, endpoint_models, workers, ctx.sleep_seconds, seed,
+                        run_timeout=ctx.run_timeout, account_min_seconds=ACCOUNT_MIN_SECONDS,
+                        post_min_seconds=POST_MIN_SECONDS).run()
+    print(format_report(report))
+    return report
+
+
+def finish_execution(ctx, exec_results):
+    if ctx.encrypt_support:
+        try:
+            persist_user_tokens(ctx)
+        except:
+            print(f"保存token异常:{traceback.format_exc()}")
+    total = len(exec_results)
+    success_count = 0
+    skipped_users = []
+    backoff_users = []
+    for result in exec_results:
+        if result.get('skipped'):
+            skipped_users.append(desensitize_user_name(result['user']))
+        elif result.get('backoff'):
+            backoff_users.append(desensitize_user_name(result['user']))
+        elif result['success'] is True:
+            success_count += 1
+    fail_count = total - success_count - len(skipped_users) - len(backoff_users)
+    summary = f"\n执行账号总数{total}，成功：{success_count}，失败：{fail_count}"
+    if len(backoff_users) > 0:
+        summary += f"，登录失败退避跳过：{len(backoff_users)}（{'、'.join(backoff_users)}）"
+    if len(skipped_users) > 0:
+        summary += f"，未执行：{len(skipped_users)}（{'、'.join(skipped_users)}）"
+    print(summary)
+    push_to_push_plus(ctx, exec_results, summary)
 
 
-def prepare_user_tokens(aes_key) -> dict:
-    data_path = r"encrypted_tokens.data"
+# 计算token明文内容摘要 按key排序保证相同内容得到相同摘要
+def digest_user_tokens(user_tokens) -> str:
+    origin_str = json.dumps(user_tokens, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(origin_str.encode("utf-8")).hexdigest()
+
+
+def snapshot_user_tokens(user_tokens) -> dict:
+    """
+    复制token用于保存
+    被中断后等待超时的账号可能仍在更新token，复制时字典大小变化会抛出RuntimeError，此时稍后重试
+    """
+    for _ in range(20):
+        try:
+            return copy.deepcopy(user_tokens)
+        except RuntimeError:
+            time.sleep(0.05)
+    return copy.deepcopy(user_tokens)
+
+
+def prepare_user_tokens(aes_key, data_path=TOKENS_PATH):
+    """
+    读取并解密token存储
+    返回：(token字典, 加载时的明文摘要)，文件不存在或无法解密时摘要为None
+    """
     if os.path.exists(data_path):
         with open(data_path, 'rb') as f:
             data = f.read()
         try:
             decrypted_data = decrypt_data(data, aes_key, None)
             # 假设原始明文为 UTF-8 编码文本
-            return json.loads(decrypted_data.decode('utf-8', errors='strict'))
+            user_tokens = json.loads(decrypted_data.decode('utf-8', errors='strict'))
+            return user_tokens, digest_user_tokens(user_tokens)
         except:
             print("密钥不正确或者加密内容损坏 放弃token")
-            return dict()
+            return dict(), None
     else:
-        return dict()
+        return dict(), None
 
-def persist_user_tokens(user_tokens, aes_key):
-    data_path = r"encrypted_tokens.data"
+def persist_user_tokens(ctx) -> bool:
+    """
+    仅当token内容相对加载时发生变化才重新加密写入
+    加密使用随机IV，内容不变时重写也会导致文件变化，进而触发无意义的git提交和推送
+    返回：是否写入了文件
+    """
+    data_path = ctx.tokens_path
+    user_tokens = snapshot_user_tokens(ctx.user_tokens)
+    current_digest = digest_user_tokens(user_tokens)
+    if current_digest == ctx.loaded_tokens_digest and os.path.exists(data_path):
+        print("token内容未变化，跳过保存")
+        return False
     origin_str = json.dumps(user_tokens, ensure_ascii=False)
-    cipher_data = encrypt_data(origin_str.encode("utf-8"), aes_key, None)
+    cipher_data = encrypt_data(origin_str.encode("utf-8"), ctx.aes_key, None)
     with open(data_path, 'wb') as f:
         f.write(cipher_data)
         f.flush()
         f.close()
+    ctx.loaded_tokens_digest = current_digest
+    print("token内容已变化，已加密保存")
+    return True
+
+
+class Runner:
+    """
+    可重入的执行入口，同一进程内可并发执行多个批次
+    各批次共享HTTP连接池（zeppHelper.http_session）和域名探测结果，配置和token互相独立
+    """
+
+    def run(self, ctx: ExecutionContext) -> list:
+        return execute(ctx)
+
+    def run_many(self, contexts, max_workers=None) -> list:
+        """
+        并发执行多个批次，按传入顺序返回各批次的执行结果
+        各批次整体读写token文件和断点文件，路径相同时后保存的会覆盖先保存的，因此要求各批次使用不同的路径
+        """
+        import concurrent.futures
+        contexts = list(contexts)
+        tokens_paths = [os.path.abspath(ctx.tokens_path) for ctx in contexts if ctx.encrypt_support]
+        if len(set(tokens_paths)) != len(tokens_paths):
+            raise ValueError("并发执行的批次不能共用token文件，请为每个批次指定不同的tokens_path")
+        checkpoint_paths = [os.path.abspath(ctx.checkpoint.path) for ctx in contexts if ctx.checkpoint is not None]
+        if len(set(checkpoint_paths)) != len(checkpoint_paths):
+            raise ValueError("并发执行的批次不能共用断点文件，请为每个批次指定不同的checkpoint_path")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+            return list(executor.map(self.run, contexts))
+
+    def simulate(self, ctx: ExecutionContext, accounts=None, endpoint_models=None, seed=0) -> dict:
+        return simulate(ctx, accounts, endpoint_models, seed)
+
+
+# 收到终止信号时转换为KeyboardInterrupt，确保收尾阶段能够执行
+def raise_interrupt(signum, frame):
+    raise KeyboardInterrupt(f"收到信号：{signum}")
+
 
 if __name__ == "__main__":
     # 北京时间
     time_bj = get_beijing_time()
-    encrypt_support = False
-    user_tokens = dict()
+    signal.signal(signal.SIGTERM, raise_interrupt)
     
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='小米运动自动刷步数工具')
@@ -384,6 +899,15 @@ if __name__ == "__main__":
     parser.add_argument('--push-plus-token', type=str, default='', help='PushPlus推送token（可选）')
     parser.add_argument('--sleep-gap', type=float, default=5, help='多账号执行间隔秒数（默认：5）')
     parser.add_argument('--interactive', '-i', action='store_true', help='交互式输入账号密码')
+    parser.add_argument('--run-timeout', type=float, default=3000, help='整体执行时间预算秒数（默认：3000），预算不足时跳过剩余账号并保存结果')
+    parser.add_argument('--resume', action='store_true', help='从断点继续：跳过当天断点有效期内已成功的账号，并恢复断点中的token')
+    parser.add_argument('--simulate', action='store_true', help='模拟执行，不发起网络请求，预估总耗时、最大并发连接数和各接口请求速率')
+    parser.add_argument('--sim-accounts', type=int, help='模拟的账号数（默认：实际配置的账号数），按现有token状态分布扩展')
+    parser.add_argument('--sim-endpoints', type=str, help='模拟使用的接口模型JSON，如 {"post_fake_brand_data": [500, 1500, 0.01]} 分别为延迟中位数毫秒、p95毫秒、错误率')
+    parser.add_argument('--history-path', type=str, default='run_history.db', help='执行历史数据库路径（默认：run_history.db）')
+    parser.add_argument('--history-report', action='store_true', help='输出执行历史报告：每日耗时p50/p95/p99、耗时最长的账号和接口延迟变化，不执行刷步数')
+    parser.add_argument('--history-days', type=int, default=14, help='执行历史报告统计的天数（默认：14）')
+    parser.add_argument('--history-retention-days', type=float, default=30, help='执行历史保留天数（默认：30）')
     parser.add_argument('--skip-token-check', action='store_true', help='跳过token API验证，仅基于时间判断（更快，但可能使用已失效的token）')
     
     args = parser.parse_args()
@@ -398,14 +922,25 @@ if __name__ == "__main__":
     
     if aes_key is not None:
         aes_key = aes_key.encode('utf-8')
-        if len(aes_key) == 16:
-            encrypt_support = True
-            user_tokens = prepare_user_tokens(aes_key)
-        else:
+        if len(aes_key) != 16:
             print("AES_KEY长度必须为16个字符，无法使用加密保存功能")
             aes_key = None
     else:
         print("AES_KEY未设置，token将不会保存到本地")
+
+    if args.history_report:
+        if not os.path.exists(args.history_path):
+            print(f"执行历史不存在：{args.history_path}")
+            exit(1)
+        history = RunHistory(args.history_path, aes_key)
+        # 执行历史中只有账号摘要，根据 --user 指定的账号还原为脱敏名称
+        names = dict()
+        if args.user:
+            for user_mi in args.user.split('#'):
+                user = MiMotionRunner(user_mi, 'x').user
+                names[history.user_key(user)] = desensitize_user_name(user_mi)
+        print(format_history_report(history, args.history_days, names=names))
+        exit(0)
     
     # 获取配置：优先从环境变量，其次从命令行参数，最后交互式输入
     config = dict()
@@ -420,7 +955,7 @@ if __name__ == "__main__":
             exit(1)
     else:
         # 本地运行模式：从命令行参数或交互式输入
-        if args.interactive or (not args.user or not args.password):
+        if not args.simulate and (args.interactive or (not args.user or not args.password)):
             # 交互式输入
             print("=" * 50)
             print("小米运动自动刷步数工具 - 本地运行模式")
@@ -463,20 +998,26 @@ if __name__ == "__main__":
             'PUSH_PLUS_HOUR': '',
             'PUSH_PLUS_MAX': '30',
             'SLEEP_GAP': str(args.sleep_gap),
+            'RUN_TIMEOUT': str(args.run_timeout),
+            'RESUME': str(args.resume),
+            'HISTORY_PATH': args.history_path,
+            'HISTORY_RETENTION_DAYS': str(args.history_retention_days),
             'USE_CONCURRENT': 'False'
         }
     
     # 初始化参数
-    PUSH_PLUS_TOKEN = config.get('PUSH_PLUS_TOKEN')
-    PUSH_PLUS_HOUR = config.get('PUSH_PLUS_HOUR')
-    PUSH_PLUS_MAX = get_int_value_default(config, 'PUSH_PLUS_MAX', 30)
+    push_plus_max = get_int_value_default(config, 'PUSH_PLUS_MAX', 30)
     sleep_seconds = config.get('SLEEP_GAP')
     if sleep_seconds is None or sleep_seconds == '':
         sleep_seconds = 5
     sleep_seconds = float(sleep_seconds)
     users = config.get('USER')
     passwords = config.get('PWD')
-    if users is None or passwords is None:
+    if args.simulate:
+        # 模拟模式不需要账号密码，未配置时使用token存储中的账号
+        users = users if users else None
+        passwords = passwords if passwords else None
+    elif users is None or passwords is None:
         print("未正确配置账号密码，无法执行")
         exit(1)
     
@@ -501,7 +1042,7 @@ if __name__ == "__main__":
             print(f"GitHub Actions模式：使用配置的随机步数范围：{min_step} ~ {max_step}")
         else:
             # 本地模式：根据时间计算步数范围
-            min_step, max_step = get_min_max_by_time()
+            min_step, max_step = get_min_max_by_time(config, time_bj)
             print(f"本地模式：使用时间计算的随机步数范围：{min_step} ~ {max_step}")
     else:
         min_step = None
@@ -524,6 +1065,66 @@ if __name__ == "__main__":
     
     if skip_token_check:
         print("已启用快速模式：跳过token API验证，仅基于时间判断")
-    
+
+    # 整体执行时间预算，需小于workflow的timeout-minutes，超出后剩余账号不再执行
+    run_timeout = config.get('RUN_TIMEOUT')
+    if run_timeout is None or run_timeout == '':
+        run_timeout = 3000
+    run_timeout = float(run_timeout)
+
+    # 执行断点：每完成一个账号写入一次，中断后可通过 --resume 或 CONFIG中的RESUME 继续
+    resume = str(config.get('RESUME', '')).lower() == 'true'
+    checkpoint_window = config.get('CHECKPOINT_WINDOW_HOURS')
+    if checkpoint_window is None or checkpoint_window == '':
+        checkpoint_window = 2
+
+    # 执行历史：每次执行追加账号和接口请求记录，设置为NO时不记录
+    history_path = config.get('HISTORY_PATH')
+    if history_path is None or history_path == '':
+        history_path = 'run_history.db'
+    history_retention = config.get('HISTORY_RETENTION_DAYS')
+    if history_retention is None or history_retention == '':
+        history_retention = 30
+    history = None
+    if history_path != 'NO' and not args.simulate:
+        try:
+            # GitHub Actions中随机密钥文件不会保留，未设置AES_KEY时不记录账号摘要
+            history = RunHistory(history_path, aes_key, float(history_retention),
+                                 stable_secret=os.environ.get("GITHUB_ACTIONS") != "true")
+        except:
+            print(f"打开执行历史异常，本次不记录:{traceback.format_exc()}")
+
+    try:
+        ctx = ExecutionContext(users, passwords, step_value, min_step, max_step,
+                               push_plus_token=config.get('PUSH_PLUS_TOKEN'), push_plus_hour=config.get('PUSH_PLUS_HOUR'),
+                               push_plus_max=push_plus_max, sleep_seconds=sleep_seconds, use_concurrent=use_concurrent,
+                               skip_token_check=skip_token_check, run_timeout=run_timeout, aes_key=aes_key,
+                               checkpoint_path="run_checkpoint.data", checkpoint_window_hours=float(checkpoint_window),
+                               resume=resume, time_bj=time_bj, history=history)
+    except ValueError as e:
+        print(e)
+        exit(1)
+    runner = Runner()
+
+    if args.simulate:
+        endpoint_models = None
+        if args.sim_endpoints:
+            endpoint_models = {name: EndpointModel(*values) for name, values in json.loads(args.sim_endpoints).items()}
+        runner.simulate(ctx, args.sim_accounts, endpoint_models)
+        exit(0)
+
+    print(f"执行时间预算：{run_timeout}秒")
+
+    # 接口域名：可在CONFIG中通过ENDPOINTS覆盖各接口的候选域名，启动时探测延迟选择最快的可用域名
+    endpoint_groups = config.get('ENDPOINTS')
+    if isinstance(endpoint_groups, str):
+        endpoint_groups = json.loads(endpoint_groups) if endpoint_groups != '' else None
+    probe_ttl = config.get('ENDPOINT_PROBE_TTL')
+    if probe_ttl is None or probe_ttl == '':
+        probe_ttl = endpoints.PROBE_TTL_SECONDS
+    registry = endpoints.configure_registry(endpoint_groups, float(probe_ttl))
+    for host, latency in registry.probe_all().items():
+        print(f"域名探测 {host}：{'不可用' if latency is None else f'{int(latency * 1000)}ms'}")
+
     # 执行
-    execute(encrypt_support, user_tokens, aes_key, step_value, min_step, max_step, skip_token_check)
+    runner.run(ctx)
@@ -0,0 +1,219 @@
+import base64
+import functools
+import hashlib
+import json
+import string
+from datetime import datetime
+from typing import List, NamedTuple
+
+import numpy as np
+import pytz
+
+# 一天的分钟数，分钟级数组长度
+MINUTES_PER_DAY = 1440
+# 单分钟步数以1字节编码，不能超过255
+MAX_STEPS_PER_MINUTE = 255
+# 步频阈值：低于 SLOW_WALK_CADENCE 视为慢走，达到 RUN_CADENCE 视为跑步
+SLOW_WALK_CADENCE = 60
+RUN_CADENCE = 130
+
+# 分钟数据类型字节 以及汇总中stage的mode取值
+MINUTE_KIND_IDLE = 80
+MINUTE_KIND_WALK = 1
+MINUTE_KIND_RUN = 16
+STAGE_MODE_SLOW_WALK = 1
+STAGE_MODE_WALK = 3
+STAGE_MODE_RUN = 4
+# 心率无数据时的填充值
+HR_NONE = 255
+
+DEVICE_ID = "DA932FFFFE8816E7"
+DATA_SOURCE = 24
+TZ_OFFSET_SECONDS = 28800
+STEP_GOAL = 8000
+
+# 每小时活动权重（北京时间），夜间为0，通勤和晚间稍高
+_HOURLY_WEIGHTS = np.array([0, 0, 0, 0, 0, 0, 0.3, 1.2, 1.6, 0.8, 0.6, 0.7,
+                            1.0, 0.8, 0.6, 0.6, 0.7, 0.9, 1.4, 1.2, 1.0, 0.8, 0.4, 0.1])
+_MINUTE_WEIGHTS = np.repeat(_HOURLY_WEIGHTS, 60)
+# 活动以10分钟为一个时段
+BLOCK_MINUTES = 10
+BLOCKS_PER_DAY = MINUTES_PER_DAY // BLOCK_MINUTES
+
+
+class ActivityProfile(NamedTuple):
+    """账号的身体参数，决定距离和卡路里的换算"""
+    stride_cm: int
+    weight_kg: int
+
+
+def _seed_of(*parts) -> int:
+    text = "|".join(str(part) for part in parts)
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+# 根据账号生成固定的身体参数，同一账号每次得到相同结果
+def profile_for_account(account) -> ActivityProfile:
+    rng = np.random.default_rng(_seed_of("profile", account))
+    return ActivityProfile(int(rng.integers(60, 80)), int(rng.integers(50, 85)))
+
+
+def _allocate(weights: np.ndarray, total: int) -> np.ndarray:
+    """
+    按权重把总数分配为整数，之和严格等于total
+    对累计值取整后差分，每个位置只会是按比例值的向下或向上取整，权重为0的位置始终为0
+    weights: 非负权重，至少有一个正数
+    """
+    cumulative = np.cumsum(weights)
+    cumulative = cumulative / cumulative[-1] * total
+    return np.diff(np.rint(cumulative).astype(np.int64), prepend=0)
+
+
+def _distribute_steps(weights: np.ndarray, total: int) -> np.ndarray:
+    """按权重分配每分钟步数，超过单分钟上限的部分重新分给其余有活动的分钟"""
+    steps = _allocate(weights, total)
+    for _ in range(16):
+        excess = int(np.clip(steps - MAX_STEPS_PER_MINUTE, 0, None).sum())
+        if excess == 0:
+            break
+        steps = np.minimum(steps, MAX_STEPS_PER_MINUTE)
+        free = np.where(steps < MAX_STEPS_PER_MINUTE, weights, 0)
+        if free.sum() == 0:
+            # 可分配的分钟不足时放开到整个活动时段
+            free = np.where(steps < MAX_STEPS_PER_MINUTE, _MINUTE_WEIGHTS + 1e-6, 0)
+        steps = steps + _allocate(free, excess)
+    return np.minimum(steps, MAX_STEPS_PER_MINUTE)
+
+
+def _generate_minutes(seed: int, total: int):
+    """
+    生成一个账号一天的分钟级数组
+    返回：steps, kinds, intensity, heart_rate 均为长度1440的数组
+    """
+    rng = np.random.default_rng(seed)
+    minute_noise = rng.random((2, MINUTES_PER_DAY))
+    block_noise = rng.random((2, BLOCKS_PER_DAY))
+    # 以10分钟为一个时段决定是否活动，使走动集中在连续时段内，stage不会过于零碎
+    block_weights = _MINUTE_WEIGHTS[::BLOCK_MINUTES] / _HOURLY_WEIGHTS.max()
+    active = (block_noise[0] < 0.08 + 0.3 * block_weights) & (block_weights > 0)
+    # 各时段强度不同，部分时段达到跑步步频
+    block_intensity = np.where(active, 0.3 + block_noise[1] ** 2, 0)
+    weights = np.repeat(block_intensity, BLOCK_MINUTES) * (0.7 + 0.3 * minute_noise[0])
+    # 避免随机后完全没有活动
+    if weights.sum() == 0:
+        weights = _MINUTE_WEIGHTS
+    steps = _distribute_steps(weights, total)
+
+    hr_noise = minute_noise[1]
+    moving = steps > 0
+    running = steps >= RUN_CADENCE
+    kinds = np.where(running, MINUTE_KIND_RUN, np.where(moving, MINUTE_KIND_WALK, MINUTE_KIND_IDLE))
+    intensity = np.where(moving, np.minimum(steps // 2 + 10, 255), (hr_noise * 8).astype(np.int64))
+    resting_hr = 60 + (hr_noise * 15).astype(np.int64)
+    # 静止时约每10分钟一次心率读数，活动时每分钟都有
+    sampled = moving | ((np.arange(MINUTES_PER_DAY) % BLOCK_MINUTES) == 0)
+    heart_rate = np.where(sampled, np.minimum(resting_hr + steps // 3, 200), HR_NONE)
+    return steps, kinds, intensity, heart_rate
+
+
+def _encode_bytes(array: np.ndarray) -> str:
+    return base64.b64encode(array.astype(np.uint8).tobytes()).decode("ascii")
+
+
+# 等同 urllib.parse.quote(text, safe="")，用查表向量化编码，避免逐字节拼接字符串，约为后者的2倍速度
+_QUOTE_SAFE = (string.ascii_letters + string.digits + "_.-~").encode("ascii")
+_QUOTE_CODES = np.array([list(b"%c\0\0" % code) if code in _QUOTE_SAFE else list(b"%%%02X" % code)
+                         for code in range(256)], dtype=np.uint8)
+_QUOTE_LENGTHS = np.array([1 if code in _QUOTE_SAFE else 3 for code in range(256)], dtype=np.int64)
+
+
+def _quote(text: str) -> str:
+    """查表一次完成整段文本的URL编码"""
+    raw = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    lengths = _QUOTE_LENGTHS[raw]
+    positions = np.cumsum(lengths) - lengths
+    output = np.empty(int(lengths.sum()), dtype=np.uint8)
+    output[positions] = _QUOTE_CODES[raw, 0]
+    escaped = lengths == 3
+    output[positions[escaped] + 1] = _QUOTE_CODES[raw[escaped], 1]
+    output[positions[escaped] + 2] = _QUOTE_CODES[raw[escaped], 2]
+    return output.tobytes().decode("ascii")
+
+
+def _stages(steps: np.ndarray, distance: np.ndarray, calories: np.ndarray) -> List[dict]:
+    """把连续的同类活动分钟合并为summary中的stage"""
+    modes = np.where(steps >= RUN_CADENCE, STAGE_MODE_RUN,
+                     np.where(steps >= SLOW_WALK_CADENCE, STAGE_MODE_WALK,
+                              np.where(steps > 0, STAGE_MODE_SLOW_WALK, 0)))
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(modes)) + 1))
+    stops = np.concatenate((starts[1:] - 1, [MINUTES_PER_DAY - 1]))
+    columns = zip(starts.tolist(), stops.tolist(), modes[starts].tolist(),
+                  np.add.reduceat(distance, starts).tolist(),
+                  np.round(np.add.reduceat(calories, starts)).astype(np.int64).tolist(),
+                  np.add.reduceat(steps, starts).tolist())
+    return [{"start": start, "stop": stop, "mode": mode, "dis": dis, "cal": cal, "step": step}
+            for start, stop, mode, dis, cal, step in columns if mode != 0]
+
+
+@functools.lru_cache(maxsize=8)
+def _day_start(date: str) -> int:
+    return int(pytz.timezone("Asia/Shanghai").localize(datetime.strptime(date, "%Y-%m-%d")).timestamp())
+
+
+def _build_record(date: str, steps, kinds, intensity, heart_rate, profile: ActivityProfile) -> str:
+    """生成单个账号一天的数据，返回未URL编码的data_json"""
+    running = steps >= RUN_CADENCE
+    # 跑步步幅更大，消耗也更高
+    distance = np.round(steps * profile.stride_cm / 100 * np.where(running, 1.3, 1.0)).astype(np.int64)
+    calories = steps * profile.weight_kg * np.where(running, 0.0008, 0.0005)
+    day_start = _day_start(date)
+    summary = {
+        "v": 6,
+        "slp": {"st": day_start, "ed": day_start, "dp": 0, "lt": 0, "wk": 0, "usrSt": -1440, "usrEd": -1440,
+                "wc": 0, "is": 0, "lb": 0, "to": 0, "dt": 0, "rhr": 0, "ss": 0},
+        "stp": {
+            "ttl": int(steps.sum()),
+            "dis": int(distance.sum()),
+            "cal": int(round(calories.sum())),
+            "wk": int(((steps > 0) & ~running).sum()),
+            "rn": int(running.sum()),
+            "runDist": int(distance[running].sum()),
+            "runCal": int(round(calories[running].sum())),
+            "stage": _stages(steps, distance, calories),
+        },
+        "goal": STEP_GOAL,
+        "tz": str(TZ_OFFSET_SECONDS),
+    }
+    # 分钟数据每分钟3字节：类型、强度、步数
+    minute_bytes = np.stack([kinds, intensity, steps], axis=1)
+    record = {
+        "data_hr": _encode_bytes(heart_rate),
+        "date": date,
+        "data": [{
+            "start": 0,
+            "stop": MINUTES_PER_DAY - 1,
+            "value": _encode_bytes(minute_bytes),
+            "tz": TZ_OFFSET_SECONDS // 900,
+            "did": DEVICE_ID,
+            "src": DATA_SOURCE,
+        }],
+        "summary": json.dumps(summary, separators=(",", ":")),
+        "source": DATA_SOURCE,
+        "type": 0,
+    }
+    return json.dumps([record], separators=(",", ":"))
+
+
+def build_data_json(date: str, step: int, account) -> str:
+    """
+    生成提交用的data_json（已URL编码），分钟数据和汇总保持一致
+    以 (账号, 日期, 步数) 为种子，同一账号同一天相同步数得到相同结果，不同账号的分钟数据互不相同
+    单次约1~3毫秒，相对提交请求本身的网络耗时可以忽略
+    参数：
+      - date: 日期 %Y-%m-%d
+      - step: 目标步数
+      - account: 账号标识（userid），同时决定身体参数
+    """
+    profile = profile_for_account(account)
+    minutes = _generate_minutes(_seed_of("minutes", account, date, int(step)), int(step))
+    return _quote(_build_record(date, *minutes, profile))
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from util.aes_help import encrypt_data, decrypt_data
+
+# 版本2：设置AES_KEY时账号摘要改为HMAC
+CHECKPOINT_VERSION = 2
+
+
+def _user_key(user, aes_key: Optional[bytes] = None) -> str:
+    # 手机号空间很小，无密钥的摘要可被穷举还原，设置了AES_KEY时使用HMAC
+    if aes_key is None:
+        return hashlib.sha256(str(user).encode("utf-8")).hexdigest()
+    return hmac.new(aes_key, str(user).encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class RunCheckpoint:
+    """
+    执行断点：每完成一个账号追加一行记录，进程中断后可从断点继续
+    文件首行为明文头部（版本、开始时间），之后每行一个账号：
+      - user: 账号摘要（设置AES_KEY时为HMAC），不保存明文账号
+      - result: 执行结果
+      - tokens: 该账号更新后的token，使用AES_KEY加密；未设置AES_KEY时不保存token
+    参数：
+      - path: 断点文件路径
+      - aes_key: 16字节AES密钥，可为None
+      - window_hours: 断点有效期，同一天内距开始时间不超过该小时数才允许恢复
+    """
+
+    def __init__(self, path: str, aes_key: Optional[bytes] = None, window_hours: float = 2):
+        self.path = path
+        self.aes_key = aes_key
+        self.window_hours = window_hours
+        self._lock = threading.Lock()
+
+    def _read(self, date: str):
+        """读取断点，头部不匹配或已过期时返回None"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0])
+        except:
+            return None
+        if header.get("version") != CHECKPOINT_VERSION or header.get("date") != date:
+            return None
+        if time.time() - header.get("start", 0) > self.window_hours * 3600:
+            return None
+        entries = dict()
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 写入过程中被中断的最后一行
+                continue
+            entries[entry["user"]] = entry
+        return header, entries
+
+    def start(self, date: str, resume=False) -> Dict[str, dict]:
+        """
+        开始新的执行，返回可恢复的记录 账号摘要 -> 记录
+        resume为False或断点无效时清空断点文件重新记录
+        """
+        previous = self._read(date) if resume else None
+        if previous is not None:
+            return previous[1]
+        with self._lock:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"version": CHECKPOINT_VERSION, "date": date, "start": time.time()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return dict()
+
+    def record(self, user, result: dict, token_key=None, token_info=None):
+        """追加一个账号的结果和token，立即落盘"""
+        # 结果中的明文账号不写入文件，恢复时按当前配置补回
+        entry = {"user": _user_key(user, self.aes_key), "result": {k: v for k, v in result.items() if k != "user"}}
+        if self.aes_key is not None and token_key is not None and token_info is not None:
+            plain = json.dumps({"key": token_key, "info": token_info}, ensure_ascii=False).encode("utf-8")
+            entry["tokens"] = base64.b64encode(encrypt_data(plain, self.aes_key, None)).decode("ascii")
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def lookup(self, entries: Dict[str, dict], user) -> Optional[dict]:
+        return entries.get(_user_key(user, self.aes_key))
+
+    def restore_tokens(self, entry: dict):
+        """解密记录中的token，返回 (token_key, token_info)，无token或密钥不匹配时返回None"""
+        if self.aes_key is None or entry.get("tokens") is None:
+            return None
+        try:
+            plain = decrypt_data(base64.b64decode(entry["tokens"]), self.aes_key, None)
+            data = json.loads(plain.decode("utf-8"))
+            return data["key"], data["info"]
+        except:
+            return None
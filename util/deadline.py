@@ -0,0 +1,55 @@
+import time
+from typing import Optional, Tuple
+
+
+class DeadlineExceeded(Exception):
+    """执行预算耗尽，放弃发起新的请求"""
+    pass
+
+
+class RunDeadline:
+    """
+    单次执行的整体时间预算
+    参数：
+      - budget_seconds: 总预算秒数，从创建时开始计时
+      - reserve_seconds: 为收尾阶段（保存token、推送汇总）预留的秒数，账号处理不会占用这部分时间
+    """
+
+    def __init__(self, budget_seconds: float, reserve_seconds: float = 60):
+        self.budget_seconds = float(budget_seconds)
+        self.reserve_seconds = float(reserve_seconds)
+        self.start = time.monotonic()
+        self.deadline = self.start + self.budget_seconds
+
+    # 距离整体截止时间剩余秒数
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    # 扣除收尾预留后，账号处理还可使用的秒数
+    def work_remaining(self) -> float:
+        return self.remaining() - self.reserve_seconds
+
+    # 剩余可用时间不足 min_seconds 时不应再开始新的账号
+    def should_stop(self, min_seconds: float = 0) -> bool:
+        return self.work_remaining() < min_seconds
+
+    # 立即结束账号处理（如收到终止信号），保留收尾阶段的预留时间
+    def expire(self):
+        self.deadline = min(self.deadline, time.monotonic() + self.reserve_seconds)
+
+    def timeout(self, timeout: Tuple[float, float]) -> Tuple[float, float]:
+        """
+        根据剩余预算收紧单个请求的（连接超时, 读取超时）
+        预算已耗尽时抛出 DeadlineExceeded，而不是发起一个注定超时的请求
+        """
+        left = self.work_remaining()
+        if left <= 0:
+            raise DeadlineExceeded("执行时间预算已耗尽")
+        connect, read = timeout
+        return min(connect, left), min(read, left)
+
+
+def resolve_timeout(timeout: Tuple[float, float], deadline: Optional[RunDeadline] = None) -> Tuple[float, float]:
+    if deadline is None:
+        return timeout
+    return deadline.timeout(timeout)
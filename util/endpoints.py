@@ -0,0 +1,126 @@
+import concurrent.futures
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+# 各接口可互相替代的域名，按默认优先级排列，探测前按此顺序使用
+ENDPOINT_GROUPS = {
+    "login_access_token": ["https://api-user.zepp.com"],
+    "grant_login_tokens": ["https://account.huami.com", "https://account-cn.huami.com", "https://account-cn3.zepp.com"],
+    "grant_app_token": ["https://account-cn.huami.com", "https://account.huami.com", "https://account-cn3.zepp.com"],
+    "renew_login_token": ["https://account-cn3.zepp.com", "https://account-cn.huami.com", "https://account.huami.com"],
+    "check_app_token": ["https://api-mifit-cn3.zepp.com", "https://api-mifit-cn.huami.com"],
+    "post_fake_brand_data": ["https://api-mifit-cn.huami.com", "https://api-mifit-cn3.zepp.com"],
+}
+
+# 探测超时（连接超时, 读取超时）单位秒
+PROBE_TIMEOUT = (2, 2)
+# 探测结果缓存时间
+PROBE_TTL_SECONDS = 1800
+
+
+class EndpointRegistry:
+    """
+    接口域名注册表：探测各域名的延迟和可用性，调用时优先使用最快的可用域名，失败时自动切换
+    参数：
+      - groups: 接口名 -> 可互相替代的域名列表，未配置的接口使用 ENDPOINT_GROUPS
+      - ttl_seconds: 探测结果有效期，过期后下次取域名时重新探测
+      - probe_timeout: 单个域名探测的（连接超时, 读取超时）
+    """
+
+    def __init__(self, groups: Optional[Dict[str, Sequence[str]]] = None, ttl_seconds: float = PROBE_TTL_SECONDS,
+                 probe_timeout: Tuple[float, float] = PROBE_TIMEOUT):
+        self.groups = {name: list(hosts) for name, hosts in ENDPOINT_GROUPS.items()}
+        if groups is not None:
+            self.groups.update({name: [host.rstrip("/") for host in hosts] for name, hosts in groups.items()})
+        self.ttl_seconds = ttl_seconds
+        self.probe_timeout = probe_timeout
+        # 域名 -> 探测延迟（秒），None表示不可用
+        self._latency: Dict[str, Optional[float]] = {}
+        self._probed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+
+    def _probe_host(self, host: str) -> Optional[float]:
+        start = time.monotonic()
+        try:
+            response = requests.head(host, timeout=self.probe_timeout, allow_redirects=False)
+        except requests.RequestException:
+            return None
+        if response.status_code >= 500:
+            return None
+        return time.monotonic() - start
+
+    def probe_all(self) -> Dict[str, Optional[float]]:
+        """并发探测所有域名，返回 域名 -> 延迟秒数（不可用为None）"""
+        hosts = sorted({host for group in self.groups.values() for host in group})
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(hosts), 1)) as executor:
+            latency = dict(zip(hosts, executor.map(self._probe_host, hosts)))
+        with self._lock:
+            self._latency = latency
+            self._probed_at = time.monotonic()
+        return latency
+
+    def _expired(self) -> bool:
+        return self._probed_at is None or time.monotonic() - self._probed_at >= self.ttl_seconds
+
+    def hosts(self, operation: str) -> List[str]:
+        """按可用性和延迟排序的域名列表，可用的按延迟从低到高，不可用的排在最后作为兜底"""
+        if self._expired():
+            # 只由一个线程执行探测，其余线程等待结果
+            with self._probe_lock:
+                if self._expired():
+                    self.probe_all()
+        group = self.groups[operation]
+        with self._lock:
+            latency = dict(self._latency)
+
+        def rank(item):
+            i, host = item
+            if host not in latency:
+                # 未探测过的域名延迟未知，排在已测速的可用域名之后
+                return 1, 0, i
+            if latency[host] is None:
+                return 2, 0, i
+            return 0, latency[host], i
+
+        return [host for _, host in sorted(enumerate(group), key=rank)]
+
+    # 调用失败的域名在下次探测前视为不可用
+    def mark_unhealthy(self, host: str):
+        with self._lock:
+            self._latency[host] = None
+
+    def request(self, operation: str, send: Callable[[str], requests.Response]) -> requests.Response:
+        """
+        依次尝试各域名直到成功，send接收域名返回响应
+        仅在连接失败或服务端5xx时切换域名；读取超时时请求可能已被处理，不再重试
+        """
+        last_response, last_error = None, None
+        for host in self.hosts(operation):
+            try:
+                response = send(host)
+            except requests.ConnectionError as e:
+                self.mark_unhealthy(host)
+                last_error = e
+                continue
+            if response.status_code >= 500:
+                self.mark_unhealthy(host)
+                last_response = response
+                continue
+            return response
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+
+# 默认注册表，同一进程内共享探测结果
+default_registry = EndpointRegistry()
+
+
+def configure_registry(groups: Optional[Dict[str, Sequence[str]]] = None, ttl_seconds: float = PROBE_TTL_SECONDS):
+    global default_registry
+    default_registry = EndpointRegistry(groups, ttl_seconds)
+    return default_registry
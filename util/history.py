@@ -0,0 +1,258 @@
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+# 表结构版本，与数据库中的 user_version 不一致时丢弃旧数据重建
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    date TEXT NOT NULL,
+    accounts INTEGER NOT NULL DEFAULT 0,
+    success INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    wall_ms REAL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    run_id INTEGER NOT NULL,
+    user_key TEXT NOT NULL,
+    phase TEXT,
+    status TEXT NOT NULL,
+    auth_ms REAL,
+    post_ms REAL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS requests (
+    run_id INTEGER NOT NULL,
+    user_key TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    host TEXT NOT NULL,
+    status INTEGER,
+    latency_ms REAL NOT NULL,
+    request_bytes INTEGER NOT NULL DEFAULT 0,
+    response_bytes INTEGER NOT NULL DEFAULT 0,
+    started REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_date ON runs (date);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started);
+CREATE INDEX IF NOT EXISTS idx_accounts_run ON accounts (run_id);
+CREATE INDEX IF NOT EXISTS idx_requests_run ON requests (run_id);
+"""
+
+# 账号结果状态
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+STATUS_BACKOFF = "backoff"
+STATUS_RESUMED = "resumed"
+
+# 最近1天的p95相对之前的基线超过该倍数，或错误率高出该差值时视为接口变慢
+DEGRADATION_RATIO = 1.5
+DEGRADATION_ERROR_DELTA = 0.05
+# 默认保留最近的天数，更早的执行记录在下次执行开始时删除
+RETENTION_DAYS = 30
+
+
+def _load_secret(path: str) -> bytes:
+    """读取密钥文件，不存在时随机生成"""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    secret = os.urandom(32)
+    with open(path, 'wb') as f:
+        f.write(secret)
+    return secret
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """最近秩法计算百分位，values为空时返回None"""
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RunHistory:
+    """
+    执行历史：每次执行追加账号和接口请求记录到本地SQLite，用于跨天对比耗时和接口变化
+    账号只保存带密钥的HMAC摘要，不保存明文或脱敏账号：手机号空间很小，无密钥的摘要或脱敏账号都可被穷举还原
+    参数：
+      - path: 数据库文件路径
+      - secret: 账号摘要的密钥，通常为AES_KEY；为None时使用 path + ".key" 中随机生成的密钥
+      - retention_days: 保留天数，开始新的执行时删除更早的记录
+      - stable_secret: 未指定secret时，密钥文件能否在多次执行间保留（如GitHub Actions中不随数据库缓存）；
+        为False时每次执行的摘要都不同，无法跨执行对比账号，因此不记录账号摘要，只统计整体耗时和接口变化
+    """
+
+    def __init__(self, path: str, secret: Optional[bytes] = None, retention_days: float = RETENTION_DAYS,
+                 stable_secret: bool = True):
+        self.path = path
+        if secret is None and stable_secret:
+            secret = _load_secret(path + ".key")
+        self.secret = secret
+        self.retention_days = retention_days
+        # 多个线程共用一个连接，写入由锁串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS runs; DROP TABLE IF EXISTS accounts; DROP TABLE IF EXISTS requests;")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def user_key(self, user) -> str:
+        """账号摘要，没有稳定的密钥时返回空字符串"""
+        if self.secret is None:
+            return ""
+        return hmac.new(self.secret, str(user).encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+    def prune(self) -> int:
+        """删除超过保留天数的执行记录，返回删除的执行次数"""
+        expired = time.time() - self.retention_days * 86400
+        with self._lock:
+            with self._conn:
+                ids = "SELECT id FROM runs WHERE started < ?"
+                self._conn.execute(f"DELETE FROM requests WHERE run_id IN ({ids})", (expired,))
+                self._conn.execute(f"DELETE FROM accounts WHERE run_id IN ({ids})", (expired,))
+                deleted = self._conn.execute("DELETE FROM runs WHERE started < ?", (expired,)).rowcount
+            if deleted > 0:
+                # 回收删除后的空闲页，使缓存的数据库文件保持紧凑
+                self._conn.execute("VACUUM")
+        return deleted
+
+    def start_run(self, date: str) -> int:
+        self.prune()
+        with self._lock, self._conn:
+            cursor = self._conn.execute("INSERT INTO runs (started, date) VALUES (?, ?)", (time.time(), date))
+        return cursor.lastrowid
+
+    def record_account(self, run_id: int, user, phase: Optional[str], status: str,
+                       auth_ms: Optional[float], post_ms: Optional[float], trace: List[dict]):
+        """写入一个账号的结果和该账号发起的全部请求"""
+        key = self.user_key(user)
+        rows = [(run_id, key, item["operation"], item["host"], item["status"], item["latency_ms"],
+                 item["request_bytes"], item["response_bytes"], item["started"]) for item in trace]
+        size = sum(item["request_bytes"] + item["response_bytes"] for item in trace)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO accounts (run_id, user_key, phase, status, auth_ms, post_ms, requests, bytes) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (run_id, key, phase, status, auth_ms, post_ms, len(trace), size))
+            self._conn.executemany("INSERT INTO requests (run_id, user_key, operation, host, status, latency_ms, "
+                                   "request_bytes, response_bytes, started) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def finish_run(self, run_id: int, accounts: int, success: int, failed: int, wall_ms: float):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET accounts = ?, success = ?, failed = ?, wall_ms = ? WHERE id = ?",
+                               (accounts, success, failed, wall_ms, run_id))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def daily_trends(self, days: int = 14) -> List[dict]:
+        """按天统计账号耗时（登录+提交）和全部请求延迟的 p50/p95/p99，未发起请求的账号（配置有误、退避、未执行）不计入"""
+        since = time.time() - days * 86400
+        account_ms: Dict[str, List[float]] = {}
+        for date, auth_ms, post_ms in self._query(
+                "SELECT r.date, a.auth_ms, a.post_ms FROM accounts a JOIN runs r ON a.run_id = r.id "
+                "WHERE r.started >= ? AND a.status IN (?, ?) AND a.requests > 0", (since, STATUS_SUCCESS, STATUS_FAILED)):
+            account_ms.setdefault(date, []).append((auth_ms or 0) + (post_ms or 0))
+        request_ms: Dict[str, List[float]] = {}
+        for date, latency_ms in self._query(
+                "SELECT r.date, q.latency_ms FROM requests q JOIN runs r ON q.run_id = r.id WHERE r.started >= ?", (since,)):
+            request_ms.setdefault(date, []).append(latency_ms)
+        trends = []
+        for date in sorted(set(account_ms) | set(request_ms)):
+            accounts = account_ms.get(date, [])
+            latencies = request_ms.get(date, [])
+            trends.append({
+                "date": date,
+                "accounts": len(accounts),
+                "account_ms": [percentile(accounts, p) for p in (50, 95, 99)],
+                "requests": len(latencies),
+                "request_ms": [percentile(latencies, p) for p in (50, 95, 99)],
+            })
+        return trends
+
+    def slowest_accounts(self, days: int = 14, limit: int = 10) -> List[dict]:
+        """平均耗时最长的账号，以账号摘要标识，未记录摘要的账号不计入"""
+        since = time.time() - days * 86400
+        rows = self._query(
+            "SELECT a.user_key, COUNT(*), AVG(COALESCE(a.auth_ms, 0) + COALESCE(a.post_ms, 0)), "
+            "SUM(a.status = ?), AVG(a.requests) FROM accounts a JOIN runs r ON a.run_id = r.id "
+            "WHERE r.started >= ? AND a.status IN (?, ?) AND a.requests > 0 AND a.user_key != '' "
+            "GROUP BY a.user_key ORDER BY 3 DESC LIMIT ?",
+            (STATUS_FAILED, since, STATUS_SUCCESS, STATUS_FAILED, limit))
+        return [{"user_key": key, "runs": runs, "avg_ms": avg_ms, "failed": failed, "avg_requests": avg_requests}
+                for key, runs, avg_ms, failed, avg_requests in rows]
+
+    def endpoint_degradation(self, days: int = 14) -> List[dict]:
+        """各接口域名最近1天与之前基线的 p95 延迟和错误率对比"""
+        now = time.time()
+        recent_since = now - 86400
+        stats: Dict[tuple, dict] = {}
+        for operation, host, status, latency_ms, started in self._query(
+                "SELECT operation, host, status, latency_ms, started FROM requests WHERE started >= ?",
+                (now - days * 86400,)):
+            item = stats.setdefault((operation, host), {"recent": [], "baseline": [], "recent_errors": 0, "baseline_errors": 0})
+            window = "recent" if started >= recent_since else "baseline"
+            item[window].append(latency_ms)
+            if status is None or status >= 500:
+                item[f"{window}_errors"] += 1
+        result = []
+        for (operation, host), item in sorted(stats.items()):
+            recent_p95 = percentile(item["recent"], 95)
+            baseline_p95 = percentile(item["baseline"], 95)
+            recent_error = item["recent_errors"] / len(item["recent"]) if item["recent"] else None
+            baseline_error = item["baseline_errors"] / len(item["baseline"]) if item["baseline"] else None
+            degraded = False
+            if recent_p95 is not None and baseline_p95 is not None:
+                degraded = recent_p95 > baseline_p95 * DEGRADATION_RATIO or recent_error - baseline_error > DEGRADATION_ERROR_DELTA
+            result.append({
+                "operation": operation,
+                "host": host,
+                "recent_requests": len(item["recent"]),
+                "recent_p95_ms": recent_p95,
+                "baseline_p95_ms": baseline_p95,
+                "recent_error_rate": recent_error,
+                "baseline_error_rate": baseline_error,
+                "degraded": degraded,
+            })
+        return result
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def _format_rate(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 100:.1f}%"
+
+
+def format_history_report(history: RunHistory, days: int = 14, limit: int = 10, names: Optional[Dict[str, str]] = None) -> str:
+    """names: 账号摘要 -> 显示名称，可由调用方根据本地配置的账号生成，未匹配的账号显示摘要"""
+    names = names or {}
+    lines = [f"最近{days}天每日耗时（毫秒，p50/p95/p99）："]
+    for trend in history.daily_trends(days):
+        lines.append(f"  {trend['date']} 账号{trend['accounts']}个：{'/'.join(map(_format_ms, trend['account_ms']))}，"
+                     f"请求{trend['requests']}次：{'/'.join(map(_format_ms, trend['request_ms']))}")
+    lines.append(f"平均耗时最长的{limit}个账号：")
+    for account in history.slowest_accounts(days, limit):
+        lines.append(f"  {names.get(account['user_key'], account['user_key'])}：执行{account['runs']}次，平均{_format_ms(account['avg_ms'])}毫秒，"
+                     f"失败{account['failed']}次，平均请求{account['avg_requests']:.1f}次")
+    lines.append("接口延迟变化（最近1天 vs 之前，p95毫秒 / 错误率）：")
+    for item in history.endpoint_degradation(days):
+        flag = "  [变慢]" if item["degraded"] else ""
+        lines.append(f"  {item['operation']} {item['host']}：{_format_ms(item['recent_p95_ms'])} vs {_format_ms(item['baseline_p95_ms'])}，"
+                     f"{_format_rate(item['recent_error_rate'])} vs {_format_rate(item['baseline_error_rate'])}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,242 @@
+import heapq
+import math
+import random
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from util.zepp_helper import ENDPOINT_TIMEOUTS
+
+
+class EndpointModel(NamedTuple):
+    """接口延迟（对数正态分布，以中位数和p95描述）和错误率"""
+    median_ms: float
+    p95_ms: float
+    error_rate: float
+
+
+# 默认的接口模型，可用实际观测值覆盖
+DEFAULT_ENDPOINT_MODELS = {
+    "login_access_token": EndpointModel(800, 2000, 0.02),
+    "grant_login_tokens": EndpointModel(400, 1200, 0.02),
+    "grant_app_token": EndpointModel(300, 900, 0.02),
+    "check_app_token": EndpointModel(250, 800, 0.01),
+    "renew_login_token": EndpointModel(300, 900, 0.02),
+    "post_fake_brand_data": EndpointModel(500, 1500, 0.01),
+}
+
+# 请求
+_REQUEST = "request"
+# 占用线程等待，不占用连接
+_SLEEP = "sleep"
+
+
+class _Stage:
+    """流水线中的一个阶段：固定数量的线程和先进先出的任务队列"""
+
+    def __init__(self, workers):
+        self.free = workers
+        self.queue = deque()
+
+
+class Simulation:
+    """
+    以离散事件方式模拟 execute() 的两阶段流水线，不发起任何网络请求
+    参数：
+      - auth_costs: 每个账号预估的登录开销，账号按此排序进入登录阶段
+      - auth_attempts: 登录开销 -> 依次尝试的请求链，每一项是一组接口，整组成功即登录成功，失败则尝试下一项
+        为None时该账号被跳过（配置有误或退避中），不发起请求、不提交，也不计为成功或失败
+      - endpoint_models: 接口名 -> EndpointModel
+      - workers: 每个阶段的线程数，为1时模拟串行模式
+      - sleep_seconds: 串行模式下同一阶段请求之间的间隔
+      - run_timeout: 整体执行时间预算，为None时不限制；与 execute() 一致，扣除 reserve_seconds 后为账号处理可用时间，
+        剩余时间不足 account_min_seconds 时不再开始登录，不足 post_min_seconds 时不再提交，请求超时按剩余时间收紧
+    """
+
+    def __init__(self, auth_costs: Sequence[int], auth_attempts: Dict[int, List[List[str]]],
+                 endpoint_models: Optional[Dict[str, EndpointModel]] = None, workers: int = 1,
+                 sleep_seconds: float = 5, seed: int = 0, run_timeout: Optional[float] = None,
+                 reserve_seconds: float = 60, account_min_seconds: float = 30, post_min_seconds: float = 15):
+        self.auth_costs = sorted(auth_costs)
+        self.auth_attempts = auth_attempts
+        self.endpoint_models = dict(DEFAULT_ENDPOINT_MODELS)
+        if endpoint_models is not None:
+            self.endpoint_models.update(endpoint_models)
+        self.workers = workers
+        self.serial = workers == 1
+        self.sleep_seconds = sleep_seconds
+        self.work_end = math.inf if run_timeout is None else run_timeout - reserve_seconds
+        self.account_min_seconds = account_min_seconds
+        self.post_min_seconds = post_min_seconds
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self._events = []
+        self._seq = 0
+        self.auth_stage = _Stage(workers)
+        self.post_stage = _Stage(workers)
+        self._posted = 0
+        # (接口, 开始时间, 结束时间, 是否成功)
+        self.requests = []
+        self.success_times = []
+        self.failed = 0
+        self.skipped = 0
+        self.not_attempted = 0
+
+    def _latency(self, endpoint):
+        """按对数正态分布采样延迟，超过读取超时记为失败"""
+        model = self.endpoint_models[endpoint]
+        sigma = math.log(model.p95_ms / model.median_ms) / 1.645 if model.p95_ms > model.median_ms else 0
+        latency = self.rng.lognormvariate(math.log(model.median_ms), sigma) / 1000
+        ok = self.rng.random() >= model.error_rate
+        connect, read = ENDPOINT_TIMEOUTS.get(endpoint, (5, 10))
+        if latency > connect + read:
+            return connect + read, False
+        return latency, ok
+
+    # 账号处理剩余可用秒数
+    def _work_left(self):
+        return self.work_end - self.now
+
+    def _stop_by_deadline(self, sent):
+        """预算耗尽时，本阶段尚未发出请求的账号计为未执行，已发出请求的计为失败"""
+        if sent == 0:
+            self.not_attempted += 1
+        else:
+            self.failed += 1
+
+    def _schedule(self, delay, process, value=None):
+        self._seq += 1
+        heapq.heappush(self._events, (self.now + delay, self._seq, process, value))
+
+    def _start(self, stage, process):
+        stage.free -= 1
+        self._schedule(0, (stage, process))
+
+    def _dispatch(self, stage):
+        while stage.free > 0 and len(stage.queue) > 0:
+            self._start(stage, stage.queue.popleft())
+
+    def _auth_process(self, cost, last):
+        if self.auth_attempts[cost] is None:
+            self.skipped += 1
+            return
+        if self._work_left() < self.account_min_seconds:
+            self.not_attempted += 1
+            return
+        ok = len(self.auth_attempts[cost]) == 0
+        sent = 0
+        for attempt in self.auth_attempts[cost]:
+            ok = True
+            for endpoint in attempt:
+                ok = yield _REQUEST, endpoint
+                if ok is None:
+                    self._stop_by_deadline(sent)
+                    return
+                sent += 1
+                if not ok:
+                    break
+            if ok:
+                break
+        if ok:
+            self.post_stage.queue.append(self._post_process())
+            self._dispatch(self.post_stage)
+        else:
+            self.failed += 1
+        if self.serial and len(self.auth_attempts[cost]) > 0 and not last:
+            yield _SLEEP, self.sleep_seconds
+
+    def _post_process(self):
+        if self.serial and self._posted > 0:
+            yield _SLEEP, self.sleep_seconds
+        self._posted += 1
+        if self._work_left() < self.post_min_seconds:
+            self.not_attempted += 1
+            return
+        ok = yield _REQUEST, "post_fake_brand_data"
+        if ok is None:
+            self._stop_by_deadline(0)
+        elif ok:
+            self.success_times.append(self.now)
+        else:
+            self.failed += 1
+
+    def _step(self, stage, process, value):
+        try:
+            kind, arg = process.send(value)
+        except StopIteration:
+            stage.free += 1
+            self._dispatch(stage)
+            return
+        left = max(self._work_left(), 0)
+        if kind == _REQUEST:
+            if left <= 0:
+                # 预算已耗尽，请求不会发出
+                self._schedule(0, (stage, process), None)
+                return
+            latency, ok = self._latency(arg)
+            if latency > left:
+                # 超时按剩余时间收紧
+                latency, ok = left, False
+            self.requests.append((arg, self.now, self.now + latency, ok))
+            self._schedule(latency, (stage, process), ok)
+        else:
+            self._schedule(min(arg, left), (stage, process))
+
+    def run(self) -> dict:
+        total = len(self.auth_costs)
+        for i, cost in enumerate(self.auth_costs):
+            self.auth_stage.queue.append(self._auth_process(cost, i == total - 1))
+        self._dispatch(self.auth_stage)
+        while self._events:
+            self.now, _, (stage, process), value = heapq.heappop(self._events)
+            self._step(stage, process, value)
+        return self.report()
+
+    def report(self) -> dict:
+        wall = max([end for _, _, end, _ in self.requests] + [self.now])
+        # 扫描请求区间得到同时进行的最大连接数
+        edges = sorted([(start, 1) for _, start, _, _ in self.requests] + [(end, -1) for _, _, end, _ in self.requests],
+                       key=lambda edge: (edge[0], edge[1]))
+        peak, current = 0, 0
+        for _, delta in edges:
+            current += delta
+            peak = max(peak, current)
+        endpoints = {}
+        for endpoint in sorted({request[0] for request in self.requests}):
+            starts = sorted(start for name, start, _, _ in self.requests if name == endpoint)
+            # 任意1秒窗口内的最大请求数
+            peak_rate, left = 0, 0
+            for right, start in enumerate(starts):
+                while start - starts[left] >= 1:
+                    left += 1
+                peak_rate = max(peak_rate, right - left + 1)
+            errors = sum(1 for name, _, _, ok in self.requests if name == endpoint and not ok)
+            endpoints[endpoint] = {
+                "requests": len(starts),
+                "errors": errors,
+                "avg_rate": len(starts) / wall if wall > 0 else 0,
+                "peak_rate": peak_rate,
+            }
+        return {
+            "accounts": len(self.auth_costs),
+            "success": len(self.success_times),
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "not_attempted": self.not_attempted,
+            "wall_seconds": wall,
+            "first_success_seconds": min(self.success_times) if self.success_times else None,
+            "peak_connections": peak,
+            "endpoints": endpoints,
+        }
+
+
+def format_report(report: dict) -> str:
+    first = report["first_success_seconds"]
+    lines = [
+        f"模拟账号数：{report['accounts']}，成功：{report['success']}，失败：{report['failed']}，跳过：{report['skipped']}，预算不足未执行：{report['not_attempted']}",
+        f"预计总耗时：{report['wall_seconds']:.1f}秒，首个成功：{'无' if first is None else f'{first:.1f}秒'}",
+        f"最大并发连接数：{report['peak_connections']}",
+    ]
+    for endpoint, stats in report["endpoints"].items():
+        lines.append(f"  {endpoint}：请求{stats['requests']}次，失败{stats['errors']}次，"
+                     f"平均{stats['avg_rate']:.2f}次/秒，峰值{stats['peak_rate']}次/秒")
+    return "\n".join(lines)